@@ -1,3 +1,5 @@
+import functools
+import sys
 from typing import List, Dict, Tuple, Union
 
 # --- Type Aliases ---
@@ -7,6 +9,20 @@ NodeID = int
 Wire = List[Union[int, str, List[str]]] # [id, name, [foot1, foot2]]
 ComponentData = Tuple[int, str, List[PhysicalHole], str] # (id, name, [foot1, foot2], spec)
 
+# Synthetic union-find root shared by every grounded node. Never a valid node string.
+_GROUND_ROOT: ElectricalNode = "GND"
+
+# Rows 'A-E' share one strip per column, as do rows 'F-J'. Maps a row letter to its strip's canonical letter
+_PREFIX_MAP: Dict[str, str] = {**dict.fromkeys('ABCDE', 'A'), **dict.fromkeys('FGHIJ', 'F')}
+
+# Power rails run the full length of the board, so every hole on a rail is the same node
+_RAIL_PREFIXES = frozenset({'U+', 'U-', 'L+', 'L-'})
+
+# SPICE name prefix per component id, offset by one so that id -1 (voltage source) is index 0
+_SUFFIX: Tuple[str, ...] = ('V', 'wire', 'R', 'C', 'I', 'MOST', 'CIRT', 'LED', 'IC')
+_UNKNOWN_SUFFIX = 'U'
+
+@functools.lru_cache(maxsize=2048)
 def hole_to_node(hole: PhysicalHole) -> ElectricalNode:
     """
     Maps a physical hole coordinate to its canonical electrical node ID.
@@ -15,30 +31,29 @@ def hole_to_node(hole: PhysicalHole) -> ElectricalNode:
         hole (PhysicalHole): The physical hole ID.
         
     Returns:
-        ElectricalNode: The canonical electrical node ID.
+        ElectricalNode: The canonical electrical node ID, interned so node lookups compare by identity.
                        Returns empty string if input is invalid.
     """
     if not hole : return ""
 
-    pref = hole[0]
-
-    # Rows 'A-E' are connected column wise (actually row-wise in breadboard terms, but let's say index-wise).
-    # Map all of them to 'A' + Column
-    if ord('A') <= ord(pref) < ord('F'):
-        return 'A' + hole[1:]
+    # Rows 'A-E' map to 'A' + Column, rows 'F-J' map to 'F' + Column.
+    mapped = _PREFIX_MAP.get(hole[0])
+    if mapped:
+        return sys.intern(mapped + hole[1:])
 
-    # Rows 'F-J' are connected column wise. Map all of them to 'F' + Column
-    elif ord('F') <= ord(pref) < ord('K'):
-        return 'F' + hole[1:]
+    # Power rails drop the column, e.g. 'L-1' and 'L-10' are both 'L-'
+    rail = hole[:2]
+    if rail in _RAIL_PREFIXES:
+        return sys.intern(rail)
 
-    # Power rails and others are returned as is
-    else:
-        return hole[:2]
+    # Unknown holes are kept whole so distinct holes never merge by accident
+    return sys.intern(hole)
 
 def build_node_map(wires: List[Wire], grounds: List[PhysicalHole]) -> Tuple[Dict[ElectricalNode, NodeID], int]:
     """
     Builds a map of {Electrical_Node_String: Electrical_Node_Int}.
-    Handles wires by merging connected nodes into the same integer ID.
+    Handles wires by merging connected nodes into the same integer ID using a
+    union-find (union by rank + path compression), so each wire is processed once.
 
     Args:
         wires (List[Wire]): List of jumper wires. 
@@ -50,44 +65,59 @@ def build_node_map(wires: List[Wire], grounds: List[PhysicalHole]) -> Tuple[Dict
             - A dictionary mapping canonical node strings to SPICE node integers.
             - The next available node integer ID.
     """
+    # Without wires nothing is merged, only the grounds are mapped
+    if not wires:
+        return {hole_to_node(g): 0 for g in grounds}, 1
+
+    parent: Dict[ElectricalNode, ElectricalNode] = {}
+    rank: Dict[ElectricalNode, int] = {}
+
+    def find(node: ElectricalNode) -> ElectricalNode:
+        # Registers unseen nodes as their own root, compresses the path on the way back
+        if node not in parent:
+            parent[node] = node
+            rank[node] = 0
+            return node
+        if parent[node] != node:
+            parent[node] = find(parent[node])
+        return parent[node]
+
+    def union(node1: ElectricalNode, node2: ElectricalNode) -> None:
+        root1, root2 = find(node1), find(node2)
+        if root1 == root2:
+            return
+        # Link the shallower tree under the deeper one
+        if rank[root1] < rank[root2]:
+            root1, root2 = root2, root1
+        parent[root2] = root1
+        if rank[root1] == rank[root2]:
+            rank[root1] += 1
+
+    # Grounds are all shorted to a synthetic root which later becomes Node 0
+    find(_GROUND_ROOT)
+    for g in grounds:
+        union(_GROUND_ROOT, hole_to_node(g))
+
+    # Processing the Wires (Short circuits). Each union handles transitive connections (A->B, B->C)
+    for wire in wires:
+        # Wire format: [id, name, [foot1, foot2]]
+        feet = wire[2]
+        # Convert physical feet to canonical rows (e.g. 'A1', 'F10')
+        union(hole_to_node(feet[0]), hole_to_node(feet[1]))
+
+    # Assign one integer ID per connected set, in order of first appearance
+    id_of: Dict[ElectricalNode, NodeID] = {find(_GROUND_ROOT): 0}
     nodemap = {}
     counter = 1
 
-    # Initializing Grounds to Node 0
-    for g in grounds:
-        node_key = hole_to_node(g)
-        nodemap[node_key] = 0
-
-    # Processing the Wires (Short circuits). Loop multiple times to propagate connection (e.g. Wire A->B, Wire B->C means A, B, C are all same node)
-    max_passes = len(wires) + 1
-    for _ in range(max_passes): 
-        for wire in wires:
-            # Wire format: [id, name, [foot1, foot2]]
-            feet = wire[2]
-            # Convert physical feet to canonical rows (e.g. 'A1', 'F10')
-            node1 = hole_to_node(feet[0])
-            node2 = hole_to_node(feet[1])
-
-            # Case 1: Both form a new isolated node
-            if node1 not in nodemap and node2 not in nodemap:
-                nodemap[node1] = counter
-                nodemap[node2] = counter
-                counter += 1
-
-            # Case 2: Connect an existing node to a new point
-            elif node1 in nodemap and node2 not in nodemap:
-                nodemap[node2] = nodemap[node1]
-            elif node2 in nodemap and node1 not in nodemap:
-                nodemap[node1] = nodemap[node2]
-
-            # Case 3: Connecting two existing nodes (Merge them)
-            elif nodemap[node1] != nodemap[node2]:
-                target_id = min(nodemap[node1], nodemap[node2])
-                old_id = max(nodemap[node1], nodemap[node2])
-                # Remap everything that was old_id to target_id
-                for k, v in nodemap.items():
-                    if v == old_id:
-                        nodemap[k] = target_id
+    for node in parent:
+        if node == _GROUND_ROOT:
+            continue
+        root = find(node)
+        if root not in id_of:
+            id_of[root] = counter
+            counter += 1
+        nodemap[node] = id_of[root]
 
     return nodemap, counter
 
@@ -110,11 +140,10 @@ def generate_spice_netlist(components: List[ComponentData], wires: List[Wire], g
 
     # Mapping Component legs to Nodes
     flags = {}
+    comp_nodes: List[List[ElectricalNode]] = [[hole_to_node(foot) for foot in component[2]] for component in components]
 
-    for component in components:
-        feet = component[2]
-        for foot in feet:
-            node = hole_to_node(foot)
+    for nodes in comp_nodes:
+        for node in nodes:
             if node in nodemap:
                 flags[node] = True
             else:
@@ -122,34 +151,32 @@ def generate_spice_netlist(components: List[ComponentData], wires: List[Wire], g
                 counter += 1
 
     # Generating SPICE string
-    result = ""
-    id_to_suffix = {-1: 'V', 0:'wire', 1: 'R', 2: 'C', 3: 'I', 4: 'MOST', 5: 'CIRT', 6: 'LED', 7: 'IC'}
-    counts = [0] * 8
+    parts = [] # Netlist lines, joined once at the end
+    counts = [0] * (len(_SUFFIX) + 1) # Last slot counts unknown components
 
     remap= {} # Remap distinct node ids to continous numbers
     newnode = 1
 
-    for component in components:
+    for component, nodes in zip(components, comp_nodes):
         comp_id = component[0]
         comp_name = component[1]
-        feet = component[2]
         spec= component[3]
 
         # If id is -1, we assume it is a V source
-        prefix = id_to_suffix.get(comp_id, "U")
-        if comp_id >= 0:
-            counts[comp_id] += 1
-            idx = counts[comp_id]
+        slot = comp_id + 1
+        if 0 <= slot < len(_SUFFIX):
+            prefix = _SUFFIX[slot]
         else:
-            idx = 1 # Counter if there are multiple power sources
-
-        line = f"{prefix}{idx}"
+            prefix = _UNKNOWN_SUFFIX
+            slot = len(_SUFFIX)
+        counts[slot] += 1
+        idx = counts[slot]
 
-        for foot in feet:
-            node = hole_to_node(foot)
+        tokens = [f"{prefix}{idx}"]
 
+        for node in nodes:
             if nodemap[node] == 0:
-                line += " 0" # Ground
+                tokens.append(" 0") # Ground
             else:
                 mapped_id = nodemap[node]
 
@@ -161,12 +188,12 @@ def generate_spice_netlist(components: List[ComponentData], wires: List[Wire], g
                         remap[mapped_id] = newnode
                         newnode += 1
 
-                    line += f" N{final_node_id:04d}"
+                    tokens.append(f" N{final_node_id:04d}")
                 else:
-                    line += " NC" # No Connection
+                    tokens.append(" NC") # No Connection
 
-        line += f" {spec}\n"
-        result += line
+        tokens.append(f" {spec}")
+        parts.append("".join(tokens))
 
-    result += ".backanno\n.end\n"
-    return result
+    parts.append(".backanno\n.end\n")
+    return "\n".join(parts)
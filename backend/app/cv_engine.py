@@ -1,7 +1,11 @@
 import cv2
 import numpy as np
 import math
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from ultralytics import YOLO
+from ultralytics.cfg import DEFAULT_CFG_DICT
 from typing import List, Tuple, Union, Optional
 
 # --- Type Definitions ---
@@ -12,6 +16,38 @@ RawComponent = Tuple[int, str, List[List[float]]] # (class_id, class_name, corne
 ComponentTerminals = Tuple[int, str, List[Point]] # (class_id, class_name, [pin1, pin2, ...])
 WireData = List[Union[int, str, List[str]]] # [id, name, [hole_id1, hole_id2]]
 HoleGrid = List[List[HoleCoord]]
+MappedComponent = Tuple[int, str, List[str]] # (class_id, class_name, [hole_id1, hole_id2, ...])
+
+# FP16 inference. Newer ultralytics replaced half=True with quantize=16 and warns on every call that still
+# passes half, so use whichever key the installed version knows. Only takes effect on GPU, FP32 on CPU
+_FP16_ARGS = dict(quantize=16) if "quantize" in DEFAULT_CFG_DICT else dict(half=True)
+
+# Predict arguments for each model. Shared with MLManager's warm-up, because ultralytics builds its
+# predictor (and picks FP16 or FP32) on the first call and keeps it for every later call.
+COMPONENT_PREDICT_ARGS = dict(save=False, conf=0.20, iou=0.25, **_FP16_ARGS)
+WIRE_PREDICT_ARGS = dict(**_FP16_ARGS)
+
+# Row letter of each row index of the HoleGrid returned by pixel_map
+_Y_TO_LETTER = ('U-', 'U+', 'A', 'B', 'C', 'D', 'E', 'J', 'I', 'H', 'G', 'F', 'L+', 'L-')
+
+# Structuring element used to close gaps in the breadboard edges. Built once and reused for every image
+_MORPH_KERNEL = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
+
+# Background worker for component inference, so it overlaps with wire inference. Torch and OpenCV release the GIL
+_INFERENCE_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="component-inference")
+
+# A YOLO instance is not thread-safe: its predictor keeps per-call state (batch, results, plotted image).
+# Every predict call takes the lock of its model, so concurrent requests sharing a model run one at a time
+_MODEL_LOCKS: "weakref.WeakKeyDictionary[YOLO, threading.Lock]" = weakref.WeakKeyDictionary()
+_MODEL_LOCKS_GUARD = threading.Lock()
+
+def _model_lock(model: YOLO) -> threading.Lock:
+    """Returns the lock that serializes inference on `model`, creating it on first use."""
+    with _MODEL_LOCKS_GUARD:
+        lock = _MODEL_LOCKS.get(model)
+        if lock is None:
+            lock = _MODEL_LOCKS[model] = threading.Lock()
+        return lock
 
 def perspective_transform(image : np.ndarray, contour : np.ndarray) -> np.ndarray:
     """
@@ -34,15 +70,10 @@ def perspective_transform(image : np.ndarray, contour : np.ndarray) -> np.ndarra
     rect[1] = pts[np.argmin(diff)]
     rect[3] = pts[np.argmax(diff)]
  
-    (tl, tr, br, bl) = rect
- 
-    widthA = np.sqrt(((br[0] - bl[0]) ** 2) + ((br[1] - bl[1]) ** 2))
-    widthB = np.sqrt(((tr[0] - tl[0]) ** 2) + ((tr[1] - tl[1]) ** 2))
-    maxWidth = max(int(widthA), int(widthB))
- 
-    heightA = np.sqrt(((tr[0] - br[0]) ** 2) + ((tr[1] - br[1]) ** 2))
-    heightB = np.sqrt(((tl[0] - bl[0]) ** 2) + ((tl[1] - bl[1]) ** 2))
-    maxHeight = max(int(heightA), int(heightB))
+    # Edge lengths in order: top, right, bottom, left
+    lengths = np.linalg.norm(rect - np.roll(rect, -1, axis=0), axis=1)
+    maxWidth = int(max(lengths[0], lengths[2]))
+    maxHeight = int(max(lengths[1], lengths[3]))
  
     dst = np.array([[0, 0], [maxWidth - 1, 0], [maxWidth - 1, maxHeight - 1], [0, maxHeight - 1]], dtype="float32")
  
@@ -74,8 +105,7 @@ def detect_breadboard(image : np.ndarray) -> np.ndarray:
 
     edges = cv2.Canny(gray, 50, 150)
 
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
-    edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel)
+    edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, _MORPH_KERNEL)
 
     contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     if not contours:
@@ -98,6 +128,20 @@ def detect_breadboard(image : np.ndarray) -> np.ndarray:
     
     return warped
 
+def _grid_rows(xs: np.ndarray, ys: np.ndarray) -> HoleGrid:
+    """
+    Builds rows of hole coordinates from the column x-coordinates and row y-coordinates of a band.
+
+    Args:
+        xs (np.ndarray): x-coordinate of each column, shape (cols,).
+        ys (np.ndarray): y-coordinate of each row, shape (rows,).
+
+    Returns:
+        HoleGrid: One list of (x, y) integer tuples per row.
+    """
+    grid = np.stack(np.broadcast_arrays(xs[None, :], ys[:, None]), axis=-1).astype(np.int32) # (rows, cols, 2)
+    return [list(map(tuple, row)) for row in grid.tolist()]
+
 def pixel_map(image : np.ndarray) -> HoleGrid:
     """
     Calculates the pixel coordinates of every hole on the breadboard based on standard spacing.
@@ -123,55 +167,25 @@ def pixel_map(image : np.ndarray) -> HoleGrid:
 
     EDGE_PER5_GAP = 3/165 * width
 
-    holes_matrix = []   # This is the matrix returned
+    # Column x-coordinates. Rail holes come in groups of 5 with an extra gap between groups
+    rail_cols = np.arange(50)
+    rail_xs = EDGE_LR_MARGIN + rail_cols * HOLE_HORIZ_GAP + (rail_cols // 5) * 0.94 * EDGE_PER5_GAP
+    mid_xs = MID_LR_MARGIN + (1.014 * np.arange(63)) * HOLE_HORIZ_GAP
 
-    # TOP RAIL (2 rows, 50 holes each)
-    for i in range(2):
-        row_coords = []
-        jump = 0
-
-        for j in range(50):
-            if j % 5 == 0 and j != 0:
-                jump += 1
-
-            basex = int(EDGE_LR_MARGIN + j * HOLE_HORIZ_GAP + jump * 0.94 * EDGE_PER5_GAP)
-            basey = int(EDGE_TD_MARGIN + i * HOLE_VERT_GAP)
-
-            row_coords.append((basex, basey))
-        holes_matrix.append(row_coords)
-
-    # MIDDLE SECTION (5 rows, 63 holes each)
-    for i in range(5):
-        row_coords = []
-        for j in range(63):
-            basex = int(MID_LR_MARGIN + (1.014 * j) * HOLE_HORIZ_GAP)
-            basey = int(MID_TD_MARGIN + i * HOLE_HORIZ_GAP)
-
-            row_coords.append((basex, basey))
-        holes_matrix.append(row_coords)
-    for i in range(5):
-        row_coords = []
-        for j in range(63):
-            basex = int(MID_LR_MARGIN + (1.014 * j) * HOLE_HORIZ_GAP)
-            basey = int(MID_TD_MARGIN + i * HOLE_HORIZ_GAP)
-
-            row_coords.append((basex, height-basey))
-        holes_matrix.append(row_coords)
-
-    # BOTTOM RAIL (mirror of top rail)
-    for i in range(2):
-        row_coords = []
-        jump = 0
+    # Row y-coordinates
+    rail_ys = EDGE_TD_MARGIN + np.arange(2) * HOLE_VERT_GAP
+    mid_ys = (MID_TD_MARGIN + np.arange(5) * HOLE_HORIZ_GAP).astype(np.int32)
 
-        for j in range(50):
-            if j % 5 == 0 and j != 0:
-                jump += 1
+    holes_matrix = []   # This is the matrix returned
+    # TOP RAIL (2 rows, 50 holes each)
+    holes_matrix += _grid_rows(rail_xs, rail_ys)
 
-            basex = int(EDGE_LR_MARGIN + j * HOLE_HORIZ_GAP + jump * 0.94 * EDGE_PER5_GAP)
-            basey = int(height - (EDGE_TD_MARGIN + i * HOLE_VERT_GAP))
+    # MIDDLE SECTION (5 rows, 63 holes each), top half then its mirror
+    holes_matrix += _grid_rows(mid_xs, mid_ys)
+    holes_matrix += _grid_rows(mid_xs, height - mid_ys)
 
-            row_coords.append((basex, basey))
-        holes_matrix.append(row_coords)
+    # BOTTOM RAIL (mirror of top rail)
+    holes_matrix += _grid_rows(rail_xs, height - rail_ys)
 
     return holes_matrix
 
@@ -187,18 +201,34 @@ def detect_components(image: np.ndarray, model: YOLO) -> List[RawComponent]:
         List[RawComponent]: A list of detected components.
                             Format: (class_id, class_name, [box_corners])
     """
-    results = model.predict(source=image, save=False, conf=0.20, iou=0.25)
-    components = []
+    return detect_components_batch([image], model)[0]
+
+def detect_components_batch(images: List[np.ndarray], model: YOLO) -> List[List[RawComponent]]:
+    """
+    Runs YOLO object detection on several breadboard images in a single inference call.
+    Calls sharing `model` are serialized, so it is safe to call from several threads.
+
+    Args:
+        images (List[np.ndarray]): The warped breadboard images.
+        model (YOLO): The loaded YOLOv8 model instance.
+
+    Returns:
+        List[List[RawComponent]]: The detected components of each image, in input order.
+    """
+    with _model_lock(model):
+        results = model.predict(source=images, **COMPONENT_PREDICT_ARGS)
+    names = model.names
+    batch_components = []
 
     for r in results:
-        boxes = r.obb  
-        names = model.names 
-        for box in boxes:
+        components = []
+        for box in r.obb:
             cls_id = int(box.cls[0].item())
             class_name = names[cls_id]
             coords = box.xyxyxyxy[0].tolist() # tensors to list
             components.append((cls_id,class_name,coords))
-    return components
+        batch_components.append(components)
+    return batch_components
 
 def get_equally_spaced_points(p1: Point, pn: Point, n: int) -> List[Point]:
     """
@@ -215,12 +245,12 @@ def get_equally_spaced_points(p1: Point, pn: Point, n: int) -> List[Point]:
     """
     x1, y1 = p1
     xn, yn = pn
+    dx, dy = xn - x1, yn - y1
+    step = n - 1
     points = []
     for i in range(n):
-        t = i / (n - 1)  # goes from 0 to 1
-        x = x1 + t * (xn - x1)
-        y = y1 + t * (yn - y1)
-        points.append((x, y))
+        t = i / step  # goes from 0 to 1
+        points.append((x1 + t * dx, y1 + t * dy))
     return points
 
 def extract_component_terminals(components: List[RawComponent]) -> List[ComponentTerminals]:
@@ -243,11 +273,11 @@ def extract_component_terminals(components: List[RawComponent]) -> List[Componen
         if cls_id == 0: continue # Skip wire class if detected by component model
 
         # Logic to find shortest/longest edges to determine orientation
-        for i in range(len(coords)):
+        n = len(coords)
+        for i in range(n):
             p1 = coords[i]
-            p2 = coords[(i+1)%len(coords)]
-            d = math.sqrt(((p1[0]-p2[0])**2) + ((p1[1]-p2[1])**2))
-            pq.append((d, (p1, p2)))
+            p2 = coords[(i+1)%n]
+            pq.append((math.hypot(p1[0]-p2[0], p1[1]-p2[1]), (p1, p2)))
 
         # Specific logic based on component type ID (resistors vs transistors etc)
         # 4: MOSFET, 5: CIRT, 7: IC
@@ -303,6 +333,42 @@ def extract_component_terminals(components: List[RawComponent]) -> List[Componen
 
     return component_endpoints_list
 
+def _holes_to_arrays(holes: HoleGrid) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Converts the hole grid into arrays for vectorized nearest-hole lookups.
+
+    Args:
+        holes (HoleGrid): The grid of hole coordinates (from pixel_map).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]:
+            - The y-coordinate of each row, shape (rows,).
+            - The x-coordinate of each hole, shape (rows, max_cols). Shorter rows are padded with inf.
+    """
+    row_ys = np.array([row[0][1] for row in holes], dtype=np.float64)
+    col_xs = np.full((len(holes), max(len(row) for row in holes)), np.inf)
+    for i, row in enumerate(holes):
+        col_xs[i, :len(row)] = [hole[0] for hole in row]
+    return row_ys, col_xs
+
+def _nearest_holes(points: np.ndarray, holes: HoleGrid) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Finds the closest breadboard hole for every point: first the closest row, then the closest column in it.
+
+    Args:
+        points (np.ndarray): Pixel coordinates, shape (N, 2) as (x, y).
+        holes (HoleGrid): The grid of hole coordinates.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Row indices and column indices of the closest holes, each shape (N,).
+    """
+    row_ys, col_xs = _holes_to_arrays(holes)
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+    rows = np.argmin(np.abs(row_ys[None, :] - points[:, 1:2]), axis=1)
+    cols = np.argmin(np.abs(col_xs[rows] - points[:, 0:1]), axis=1)
+    return rows, cols
+
 def detect_wires(image: np.ndarray, model: YOLO, holes: HoleGrid) -> List[WireData]:
     """
     Detects jumper wires using Keypoint detection and maps endpoints to breadboard hole IDs.
@@ -316,46 +382,39 @@ def detect_wires(image: np.ndarray, model: YOLO, holes: HoleGrid) -> List[WireDa
         List[WireData]: A list of wires with their connected holes.
                         Format: [0, "Wire N", ["A1", "J63"]]
     """
-    y_to_letter = {0:'U-',1:'U+',2:'A',3:'B',4:'C',5:'D',6:'E',7:'J',8:'I',9:'H',10:'G',11:'F',12:'L+',13:'L-'}
-    results = model(image)[0]
-    endpoints = []
-
-    for kpts in results.keypoints.xy:
-        if kpts.shape[0] < 2: continue
-        x1, y1 = kpts[0]
-        x2, y2 = kpts[1]
-        endpoints.append(((x1, y1), (x2, y2)))
-
-    wire_data = []
-
-    for idx, end_pair in enumerate(endpoints):
-        brdbord_coords = []
-        for coords in end_pair:
-            # Find closest hole
-            closest_y = 0
-            closest_x = 0
-            smallest_gap = float('inf')
-
-            # Find row
-            for i in range(14):
-                if abs(holes[i][0][1] - coords[1]) < smallest_gap:
-                    smallest_gap = abs(holes[i][0][1] - coords[1])
-                    closest_y = i
-
-            # Find col
-            smallest_gap = float('inf')
-            for j in range(len(holes[closest_y])):
-                if abs(holes[closest_y][j][0] - coords[0]) < smallest_gap:
-                    smallest_gap = abs(holes[closest_y][j][0] - coords[0])
-                    closest_x = j
-
-            brdbord_coords.append(y_to_letter[closest_y] + str(closest_x))
-
-        wire_data.append([0, f"Wire {idx+1}", brdbord_coords])
-
-    return wire_data
-
-def map_terminals_to_holes(components: List[ComponentTerminals], holes: HoleGrid) -> List[Tuple[int, str, List[str]]]:
+    return detect_wires_batch([image], model, [holes])[0]
+
+def detect_wires_batch(images: List[np.ndarray], model: YOLO, holes: List[HoleGrid]) -> List[List[WireData]]:
+    """
+    Detects jumper wires on several breadboard images in a single inference call.
+    Calls sharing `model` are serialized, so it is safe to call from several threads.
+
+    Args:
+        images (List[np.ndarray]): The warped breadboard images.
+        model (YOLO): The wire endpoint detection model.
+        holes (List[HoleGrid]): The hole grid of each image (from pixel_map), in the same order as images.
+
+    Returns:
+        List[List[WireData]]: The wires of each image, in input order.
+    """
+    with _model_lock(model):
+        results = model.predict(source=images, **WIRE_PREDICT_ARGS)
+    batch_wires = []
+
+    for result, grid in zip(results, holes):
+        kpts = result.keypoints.xy.cpu().numpy() # (N, keypoints, 2)
+        if kpts.shape[1] < 2:
+            kpts = kpts[:0] # A wire needs both endpoints
+
+        # Map every endpoint to its closest hole in one pass
+        rows, cols = _nearest_holes(kpts[:, :2].reshape(-1, 2), grid)
+        hole_ids = [_Y_TO_LETTER[r] + str(c) for r, c in zip(rows.tolist(), cols.tolist())]
+
+        batch_wires.append([[0, f"Wire {idx+1}", hole_ids[2*idx:2*idx+2]] for idx in range(len(kpts))])
+
+    return batch_wires
+
+def map_terminals_to_holes(components: List[ComponentTerminals], holes: HoleGrid) -> List[MappedComponent]:
     """
     Maps component terminal coordinates to the nearest breadboard holes.
 
@@ -364,36 +423,54 @@ def map_terminals_to_holes(components: List[ComponentTerminals], holes: HoleGrid
         holes (HoleGrid): The grid of hole coordinates.
  
     Returns:
-        List[Tuple[int, str, List[str]]]: List of components mapped to physical holes.
+        List[MappedComponent]: List of components mapped to physical holes.
                                           Format: (class_id, class_name, ["A1", "B2", ...])
     """
-    y_to_letter = {0:'U-',1:'U+',2:'A',3:'B',4:'C',5:'D',6:'E',7:'J',8:'I',9:'H',10:'G',11:'F',12:'L+',13:'L-'}
+
+    # Map the terminals of all components in one pass
+    pts = np.array([coords for comp in components for coords in comp[2]], dtype=np.float64)
+    rows, cols = _nearest_holes(pts, holes)
+    hole_ids = [_Y_TO_LETTER[r] + str(c) for r, c in zip(rows.tolist(), cols.tolist())]
+
     mapped_components = []
+    start = 0
 
     for comp in components:
         cls_id, name, terminals = comp
-        mapped_terminals = []
+        mapped_terminals = hole_ids[start:start + len(terminals)]
+        start += len(terminals)
 
-        for coords in terminals:
-            closest_y = 0
-            closest_x = 0
-            smallest_gap = float('inf')
+        mapped_components.append((cls_id, name, mapped_terminals))
 
-            # Find row
-            for i in range(14):
-                if abs(holes[i][0][1] - coords[1]) < smallest_gap:
-                    smallest_gap = abs(holes[i][0][1] - coords[1])
-                    closest_y = i
+    return mapped_components
 
-            # Find col
-            smallest_gap = float('inf')
-            for j in range(len(holes[closest_y])):
-                if abs(holes[closest_y][j][0] - coords[0]) < smallest_gap:
-                    smallest_gap = abs(holes[closest_y][j][0] - coords[0])
-                    closest_x = j
+def analyze_breadboard(image: np.ndarray, comp_model: YOLO, wire_model: YOLO) -> Tuple[np.ndarray, List[MappedComponent], List[WireData]]:
+    """
+    Runs the full CV pipeline on a raw image: breadboard detection, component and wire detection, hole mapping.
+    Component inference runs on a background thread while the hole grid and wire inference run on the caller's thread.
+    Each model still runs one prediction at a time, so concurrent calls sharing the models queue on them.
 
-            mapped_terminals.append(y_to_letter[closest_y] + str(closest_x))
+    Args:
+        image (np.ndarray): The raw input image.
+        comp_model (YOLO): The component detection model.
+        wire_model (YOLO): The wire endpoint detection model.
 
-        mapped_components.append((cls_id, name, mapped_terminals))
+    Returns:
+        Tuple[np.ndarray, List[MappedComponent], List[WireData]]:
+            - The warped top-down view of the breadboard.
+            - Components mapped to physical holes.
+            - Wires with their connected holes.
 
-    return mapped_components
+    Raises:
+        ValueError: If no suitable breadboard contour is found.
+    """
+    warped = detect_breadboard(image)
+
+    components_future = _INFERENCE_POOL.submit(detect_components, warped, comp_model)
+    holes = pixel_map(warped)
+    wires = detect_wires(warped, wire_model, holes)
+
+    terminals = extract_component_terminals(components_future.result())
+    components = map_terminals_to_holes(terminals, holes)
+
+    return warped, components, wires
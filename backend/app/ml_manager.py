@@ -1,6 +1,11 @@
 from ultralytics import YOLO
-import os
-from typing import Optional
+import numpy as np
+from typing import Any, Dict, Optional
+
+from .cv_engine import COMPONENT_PREDICT_ARGS, WIRE_PREDICT_ARGS
+
+# Dummy frame used to warm up the models at startup, in the 165:54 aspect ratio of a warped breadboard
+_WARMUP_SHAPE = (210, 640, 3)
 
 class MLManager:
     """
@@ -35,12 +40,30 @@ class MLManager:
         """
         print(f"Loading Component Model from: {comp_model_path}...")
         self.comp_model = YOLO(comp_model_path)
+        self._warm_up(self.comp_model, COMPONENT_PREDICT_ARGS)
  
         print(f"Loading Wire Model from: {wire_model_path}...")
         self.wire_model = YOLO(wire_model_path)
+        self._warm_up(self.wire_model, WIRE_PREDICT_ARGS)
 
         print("Loaded Models successfully")
 
+    @staticmethod
+    def _warm_up(model: YOLO, predict_args: Dict[str, Any]) -> None:
+        """
+        Runs a single prediction on a blank frame, so the predictor is built and the kernels are
+        warmed at startup instead of on the first request. Uses the same arguments as production,
+        since the first call fixes the predictor's settings (e.g. FP16) for every later call.
+
+        Args:
+            model (YOLO): The freshly loaded model.
+            predict_args (Dict[str, Any]): The predict arguments the model is used with.
+        """
+        try:
+            model.predict(np.zeros(_WARMUP_SHAPE, dtype=np.uint8), verbose=False, **predict_args)
+        except Exception as e:
+            print(f"Model warm-up failed: {e}")
+
     def get_component_model(self) -> YOLO:
         """
         Retrieves the loaded component detection model.
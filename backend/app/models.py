@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Annotated, List, Tuple, Optional
+from typing import List, Optional
 
 # Base Geometry Models
 class Point(BaseModel):
@@ -0,0 +1,140 @@
+import random
+import sys
+
+import pytest
+
+from app.circuit_solver import build_node_map, generate_spice_netlist, hole_to_node
+
+
+# --- Reference implementation ---
+def _reference_build_node_map(wires, grounds):
+    """Fixed-point node merging from before the union-find rewrite. Slow but obviously correct."""
+    nodemap = {}
+    counter = 1
+    for g in grounds:
+        nodemap[hole_to_node(g)] = 0
+
+    for _ in range(len(wires) + 1):
+        for wire in wires:
+            node1 = hole_to_node(wire[2][0])
+            node2 = hole_to_node(wire[2][1])
+            if node1 not in nodemap and node2 not in nodemap:
+                nodemap[node1] = counter
+                nodemap[node2] = counter
+                counter += 1
+            elif node2 not in nodemap:
+                nodemap[node2] = nodemap[node1]
+            elif node1 not in nodemap:
+                nodemap[node1] = nodemap[node2]
+            elif nodemap[node1] != nodemap[node2]:
+                target_id = min(nodemap[node1], nodemap[node2])
+                old_id = max(nodemap[node1], nodemap[node2])
+                for k, v in nodemap.items():
+                    if v == old_id:
+                        nodemap[k] = target_id
+    return nodemap
+
+
+def _random_hole(rng):
+    if rng.random() < 0.2:
+        return rng.choice(['U+', 'U-', 'L+', 'L-']) + str(rng.randrange(50))
+    return rng.choice('ABCDEFGHIJ') + str(rng.randrange(63))
+
+
+# --- hole_to_node ---
+@pytest.mark.parametrize("hole, node", [
+    ('A5', 'A5'), ('C5', 'A5'), ('E63', 'A63'),
+    ('F0', 'F0'), ('H12', 'F12'), ('J63', 'F63'),
+])
+def test_hole_to_node_maps_strips(hole, node):
+    assert hole_to_node(hole) == node
+
+
+@pytest.mark.parametrize("hole", ['L-1', 'L-10', 'L-49'])
+def test_hole_to_node_collapses_rails(hole):
+    assert hole_to_node(hole) == 'L-'
+
+
+@pytest.mark.parametrize("hole, node", [('U+0', 'U+'), ('U-7', 'U-'), ('L+12', 'L+')])
+def test_hole_to_node_keeps_rail_sign(hole, node):
+    assert hole_to_node(hole) == node
+
+
+@pytest.mark.parametrize("hole", ['X1', 'X12', 'K5'])
+def test_hole_to_node_keeps_unknown_holes_whole(hole):
+    assert hole_to_node(hole) == hole
+
+
+def test_hole_to_node_empty():
+    assert hole_to_node('') == ''
+
+
+@pytest.mark.parametrize("hole", ['C17', 'H40', 'L+33', 'X99'])
+def test_hole_to_node_interns_nodes(hole):
+    node = hole_to_node(hole)
+    assert sys.intern(''.join(node)) is node
+
+
+# --- build_node_map ---
+def test_build_node_map_no_wires():
+    assert build_node_map([], ['C3']) == ({'A3': 0}, 1)
+
+
+def test_build_node_map_chains_wires_and_ground():
+    wires = [[0, "Wire 1", ["A1", "F1"]], [0, "Wire 2", ["J1", "L-3"]], [0, "Wire 3", ["B7", "G9"]]]
+    nodemap, counter = build_node_map(wires, ["L-0"])
+
+    assert nodemap['A1'] == nodemap['F1'] == nodemap['L-'] == 0
+    assert nodemap['A7'] == nodemap['F9'] != 0
+    assert counter == 2
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_build_node_map_matches_reference(seed):
+    rng = random.Random(seed)
+    wires = [[0, f"Wire {i}", [_random_hole(rng), _random_hole(rng)]] for i in range(rng.randrange(20))]
+    grounds = [_random_hole(rng) for _ in range(rng.randrange(3))]
+
+    nodemap, _ = build_node_map(wires, grounds)
+    expected = _reference_build_node_map(wires, grounds)
+
+    # IDs may differ, but the same nodes must be grounded and grouped together
+    assert nodemap.keys() == expected.keys()
+    for a in expected:
+        assert (nodemap[a] == 0) == (expected[a] == 0)
+        for b in expected:
+            assert (nodemap[a] == nodemap[b]) == (expected[a] == expected[b])
+
+
+# --- generate_spice_netlist ---
+def test_generate_spice_netlist():
+    components = [
+        (-1, "Battery", ["U+1", "U-1"], "DC 5"),
+        (1, "Resistor", ["A5", "U+4"], "1k"),
+        (6, "LED", ["C5", "F9"], "LED"),
+        (1, "Resistor", ["H9", "L-2"], "220"),
+    ]
+    wires = [[0, "Wire 1", ["U-10", "L-20"]]]
+    netlist = generate_spice_netlist(components, wires, ["L-0"])
+
+    assert netlist == (
+        "V1 N0001 0 DC 5\n"
+        "R1 N0002 N0001 1k\n"
+        "LED1 N0002 N0003 LED\n"
+        "R2 N0003 0 220\n"
+        ".backanno\n.end\n"
+    )
+
+
+def test_generate_spice_netlist_numbers_sources_and_unknown_ids():
+    components = [
+        (-1, "Battery", ["U+1", "U-1"], "5"),
+        (-1, "Battery", ["A1", "U-2"], "3"),
+        (9, "Mystery", ["A1", "F1"], "x"),
+        (-5, "Mystery", ["A1", "F2"], "y"),
+    ]
+    lines = generate_spice_netlist(components, [], ["U-0"]).splitlines()
+
+    assert [line.split()[0] for line in lines[:4]] == ["V1", "V2", "U1", "U2"]
+    assert lines[1].split()[2] == "0"
+    assert lines[2].split()[2] == "NC"
@@ -0,0 +1,395 @@
+import math
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+import torch
+from ultralytics.cfg import get_cfg
+from ultralytics.utils import LOGGER
+
+from app.cv_engine import (
+    COMPONENT_PREDICT_ARGS, WIRE_PREDICT_ARGS, analyze_breadboard, detect_breadboard, detect_components,
+    detect_components_batch, detect_wires, detect_wires_batch, extract_component_terminals, get_equally_spaced_points, map_terminals_to_holes,
+    perspective_transform, pixel_map,
+)
+
+
+# --- Stub models ---
+class _StubComponentModel:
+    """Stands in for the OBB component model. Returns the next entry of `detections` for each image."""
+    names = {1: "Resistor", 4: "MOSFET", 7: "IC"}
+
+    def __init__(self, detections):
+        self.detections = list(detections) # per image: [(class_id, corners), ...]
+        self.calls = []
+
+    def predict(self, source, **kwargs):
+        self.calls.append((len(source), kwargs))
+        results = []
+        for _ in source:
+            obb = [SimpleNamespace(cls=torch.tensor([float(cls_id)]), xyxyxyxy=torch.tensor([corners]))
+                   for cls_id, corners in self.detections.pop(0)]
+            results.append(SimpleNamespace(obb=obb))
+        return results
+
+
+class _StubWireModel:
+    """Stands in for the wire keypoint model. Returns the next entry of `keypoints` for each image."""
+
+    def __init__(self, keypoints):
+        self.keypoints = list(keypoints) # per image: array of shape (wires, keypoints, 2)
+        self.calls = []
+
+    def predict(self, source, **kwargs):
+        self.calls.append((len(source), kwargs))
+        results = []
+        for _ in source:
+            xy = torch.tensor(np.asarray(self.keypoints.pop(0), dtype=np.float32))
+            results.append(SimpleNamespace(keypoints=SimpleNamespace(xy=xy)))
+        return results
+
+
+class _SerialProbe:
+    """Wraps a stub model and records the most predict calls that were ever running on it at once."""
+
+    def __init__(self, model, delay=0.02):
+        self.model, self.delay = model, delay
+        self.names = getattr(model, "names", None)
+        self.active = self.max_active = 0
+        self._count_lock = threading.Lock()
+
+    def predict(self, source, **kwargs):
+        with self._count_lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            return self.model.predict(source, **kwargs)
+        finally:
+            with self._count_lock:
+                self.active -= 1
+
+
+def _blank(height=440, width=700):
+    return np.zeros((height, width, 3), dtype=np.uint8)
+
+
+# --- Reference implementations ---
+def _reference_pixel_map(height, width):
+    """Per-hole loop version of pixel_map from before vectorization."""
+    MID_LR_MARGIN = 4/165 * width
+    MID_TD_MARGIN = 13/54 * height
+    EDGE_LR_MARGIN = 8.5/165 * width
+    EDGE_TD_MARGIN = 3/54 * height
+    HOLE_VERT_GAP = 2.5/54 * height
+    HOLE_HORIZ_GAP = 2.5/165 * width
+    EDGE_PER5_GAP = 3/165 * width
+
+    def rail(i, bottom):
+        row = []
+        for j in range(50):
+            basex = int(EDGE_LR_MARGIN + j * HOLE_HORIZ_GAP + (j // 5) * 0.94 * EDGE_PER5_GAP)
+            offset = EDGE_TD_MARGIN + i * HOLE_VERT_GAP
+            row.append((basex, int(height - offset) if bottom else int(offset)))
+        return row
+
+    def middle(i, bottom):
+        row = []
+        for j in range(63):
+            basex = int(MID_LR_MARGIN + (1.014 * j) * HOLE_HORIZ_GAP)
+            basey = int(MID_TD_MARGIN + i * HOLE_HORIZ_GAP)
+            row.append((basex, height - basey if bottom else basey))
+        return row
+
+    return ([rail(i, False) for i in range(2)] + [middle(i, False) for i in range(5)]
+            + [middle(i, True) for i in range(5)] + [rail(i, True) for i in range(2)])
+
+
+def _reference_nearest_hole(coords, holes):
+    """Linear row-then-column search from before vectorization."""
+    closest_y = min(range(len(holes)), key=lambda i: abs(holes[i][0][1] - coords[1]))
+    closest_x = min(range(len(holes[closest_y])), key=lambda j: abs(holes[closest_y][j][0] - coords[0]))
+    return closest_y, closest_x
+
+
+def _reference_equally_spaced_points(p1, pn, n):
+    return [(p1[0] + i / (n - 1) * (pn[0] - p1[0]), p1[1] + i / (n - 1) * (pn[1] - p1[1])) for i in range(n)]
+
+
+def _reference_component_terminals(components):
+    """Per-edge loop version of extract_component_terminals from the initial import."""
+    result = []
+    for cls_id, class_name, coords in components:
+        if cls_id == 0:
+            continue
+        pq = []
+        for i in range(len(coords)):
+            p1, p2 = coords[i], coords[(i + 1) % len(coords)]
+            pq.append((math.sqrt(((p1[0] - p2[0]) ** 2) + ((p1[1] - p2[1]) ** 2)), (p1, p2)))
+
+        short = pq[0][0] < pq[1][0]
+        if cls_id in [4, 5]:
+            (_, edge1), (_, edge2) = (pq[0], pq[2]) if short else (pq[1], pq[3])
+            end1 = ((edge1[0][0] + edge1[1][0]) // 2, (edge1[0][1] + edge1[1][1]) // 2)
+            end2 = ((edge2[0][0] + edge2[1][0]) // 2, (edge2[0][1] + edge2[1][1]) // 2)
+            result.append((cls_id, class_name, _reference_equally_spaced_points(end1, end2, 3)))
+        elif cls_id == 7:
+            (d1, edge1), (_, edge2), (d2, _) = (pq[0], pq[2], pq[1]) if pq[0][0] > pq[1][0] else (pq[1], pq[3], pq[0])
+            pins = 4 if d1 / d2 < 2 else 8
+            result.append((cls_id, class_name, _reference_equally_spaced_points(edge1[0], edge1[1], pins)
+                           + _reference_equally_spaced_points(edge2[0], edge2[1], pins)))
+        else:
+            (_, edge1), (_, edge2) = (pq[0], pq[2]) if short else (pq[1], pq[3])
+            end1 = ((edge1[0][0] + edge1[1][0]) / 2, (edge1[0][1] + edge1[1][1]) / 2)
+            end2 = ((edge2[0][0] + edge2[1][0]) / 2, (edge2[0][1] + edge2[1][1]) / 2)
+            result.append((cls_id, class_name, [end1, end2]))
+    return result
+
+
+def _board_photo():
+    """A bright rectangular board on a dark background, for detect_breadboard to find."""
+    image = np.full((600, 900, 3), 30, dtype=np.uint8)
+    cv2.rectangle(image, (100, 80), (800, 520), (235, 235, 235), thickness=-1)
+    return image
+
+
+def _board_models(runs, seed=0):
+    """Component and wire stubs that answer `runs` analyze_breadboard calls with the same detections."""
+    rng = random.Random(seed)
+    detections = [(rng.choice([1, 4, 7]), _random_box(rng)) for _ in range(6)]
+    keypoints = np.array([[[rng.uniform(0, 700), rng.uniform(0, 440)] for _ in range(2)] for _ in range(4)])
+    return _StubComponentModel([detections] * runs), _StubWireModel([keypoints] * runs)
+
+
+def _random_box(rng):
+    """Corners of a randomly placed and rotated rectangle, as the OBB detector returns them."""
+    cx, cy = rng.uniform(0, 900), rng.uniform(0, 600)
+    w, h, theta = rng.uniform(5, 80), rng.uniform(5, 80), rng.uniform(0, 2 * math.pi)
+    c, s = math.cos(theta), math.sin(theta)
+    return [[cx + c * dx - s * dy, cy + s * dx + c * dy] for dx, dy in [(-w/2, -h/2), (w/2, -h/2), (w/2, h/2), (-w/2, h/2)]]
+
+
+def _reference_warp_size(contour):
+    """(width, height) of the warped image, as computed by perspective_transform in the initial import."""
+    pts = contour.reshape(4, 2)
+    s, diff = pts.sum(axis=1), np.diff(pts, axis=1)
+    tl, tr, br, bl = (pts[np.argmin(s)], pts[np.argmin(diff)], pts[np.argmax(s)], pts[np.argmax(diff)])
+    tl, tr, br, bl = (np.float32(tl), np.float32(tr), np.float32(br), np.float32(bl))
+    width = max(int(np.sqrt(((br[0] - bl[0]) ** 2) + ((br[1] - bl[1]) ** 2))),
+                int(np.sqrt(((tr[0] - tl[0]) ** 2) + ((tr[1] - tl[1]) ** 2))))
+    height = max(int(np.sqrt(((tr[0] - br[0]) ** 2) + ((tr[1] - br[1]) ** 2))),
+                 int(np.sqrt(((tl[0] - bl[0]) ** 2) + ((tl[1] - bl[1]) ** 2))))
+    return width, height
+
+
+_Y_TO_LETTER = ('U-', 'U+', 'A', 'B', 'C', 'D', 'E', 'J', 'I', 'H', 'G', 'F', 'L+', 'L-')
+
+
+# --- pixel_map ---
+@pytest.mark.parametrize("height, width", [(216, 660), (440, 700), (540, 1650), (1001, 2999)])
+def test_pixel_map_matches_reference(height, width):
+    holes = pixel_map(np.zeros((height, width, 3), dtype=np.uint8))
+
+    assert holes == _reference_pixel_map(height, width)
+    assert [len(row) for row in holes] == [50, 50] + [63] * 10 + [50, 50]
+    assert all(type(hole) is tuple and type(hole[0]) is int for row in holes for hole in row)
+
+
+# --- perspective_transform ---
+@pytest.mark.parametrize("seed", range(20))
+def test_perspective_transform_size_matches_reference(seed):
+    rng = np.random.default_rng(seed)
+    image = rng.integers(0, 255, (400, 600, 3), dtype=np.uint8)
+    corners = np.array([[50, 40], [550, 60], [560, 350], [40, 330]], dtype=np.float64)
+    contour = corners + rng.uniform(-30, 30, corners.shape)
+
+    warped = perspective_transform(image, rng.permutation(contour))
+
+    width, height = _reference_warp_size(contour)
+    assert warped.shape == (height, width, 3)
+
+
+def test_perspective_transform_crops_axis_aligned_board():
+    image = np.zeros((100, 200, 3), dtype=np.uint8)
+    image[20:61, 30:131] = 255
+    contour = np.array([[130, 60], [30, 20], [130, 20], [30, 60]], dtype=np.float64)
+
+    warped = perspective_transform(image, contour)
+
+    assert warped.shape == (40, 100, 3)
+    assert warped.min() == 255
+
+
+# --- map_terminals_to_holes ---
+def test_map_terminals_to_holes_exact_holes():
+    holes = pixel_map(np.zeros((440, 700, 3), dtype=np.uint8))
+    components = [(1, "Resistor", [holes[2][5], holes[11][5]]), (7, "IC", [holes[0][3], holes[13][49]])]
+
+    assert map_terminals_to_holes(components, holes) == [
+        (1, "Resistor", ["A5", "F5"]),
+        (7, "IC", ["U-3", "L-49"]),
+    ]
+
+
+def test_map_terminals_to_holes_empty():
+    holes = pixel_map(np.zeros((440, 700, 3), dtype=np.uint8))
+
+    assert map_terminals_to_holes([], holes) == []
+    assert map_terminals_to_holes([(1, "Resistor", [])], holes) == [(1, "Resistor", [])]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_map_terminals_to_holes_matches_reference(seed):
+    rng = random.Random(seed)
+    height, width = rng.randrange(200, 1200), rng.randrange(600, 2400)
+    holes = pixel_map(np.zeros((height, width, 3), dtype=np.uint8))
+    components = [
+        (rng.randrange(8), "Component", [(rng.uniform(-20, width + 20), rng.uniform(-20, height + 20))
+                                         for _ in range(rng.choice([2, 3, 8, 16]))])
+        for _ in range(rng.randrange(10))
+    ]
+
+    expected = []
+    for cls_id, name, terminals in components:
+        nearest = [_reference_nearest_hole(coords, holes) for coords in terminals]
+        expected.append((cls_id, name, [_Y_TO_LETTER[y] + str(x) for y, x in nearest]))
+
+    assert map_terminals_to_holes(components, holes) == expected
+
+
+# --- extract_component_terminals ---
+@pytest.mark.parametrize("n", [2, 3, 4, 8])
+@pytest.mark.parametrize("seed", range(5))
+def test_get_equally_spaced_points_matches_reference(seed, n):
+    rng = random.Random(seed)
+    p1 = (rng.uniform(0, 1650), rng.uniform(0, 540))
+    pn = (rng.uniform(0, 1650), rng.uniform(0, 540))
+
+    points = get_equally_spaced_points(p1, pn, n)
+
+    assert all(isinstance(point, tuple) for point in points)
+    assert np.allclose(points, _reference_equally_spaced_points(p1, pn, n), rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_extract_component_terminals_matches_reference(seed):
+    rng = random.Random(seed)
+    components = [(rng.randrange(8), "Component", _random_box(rng)) for _ in range(25)]
+
+    terminals = extract_component_terminals(components)
+    expected = _reference_component_terminals(components)
+
+    assert [(cls_id, name, len(pins)) for cls_id, name, pins in terminals] == \
+           [(cls_id, name, len(pins)) for cls_id, name, pins in expected]
+    for (_, _, pins), (_, _, expected_pins) in zip(terminals, expected):
+        assert np.allclose(pins, expected_pins, rtol=0, atol=1e-9)
+
+
+# --- detect_components / detect_wires ---
+@pytest.mark.parametrize("args", [COMPONENT_PREDICT_ARGS, WIRE_PREDICT_ARGS])
+def test_predict_args_enable_fp16_without_deprecation_warning(args, monkeypatch):
+    warnings = []
+    monkeypatch.setattr(LOGGER, "warning", lambda msg, *a, **kw: warnings.append(msg))
+
+    cfg = get_cfg(overrides=dict(args))
+
+    assert warnings == []
+    assert getattr(cfg, "quantize", None) == 16 or getattr(cfg, "half", None) is True
+
+
+def test_detect_components_batch_runs_one_prediction():
+    box = [[10.0, 20.0], [50.0, 20.0], [50.0, 30.0], [10.0, 30.0]]
+    model = _StubComponentModel([[(1, box)], [(7, box), (4, box)]])
+
+    components = detect_components_batch([_blank(), _blank()], model)
+
+    assert model.calls == [(2, COMPONENT_PREDICT_ARGS)]
+    assert components == [[(1, "Resistor", box)], [(7, "IC", box), (4, "MOSFET", box)]]
+
+
+def test_detect_components_single_image():
+    box = [[10.0, 20.0], [50.0, 20.0], [50.0, 30.0], [10.0, 30.0]]
+
+    assert detect_components(_blank(), _StubComponentModel([[(1, box)]])) == [(1, "Resistor", box)]
+
+
+def test_detect_wires_batch_maps_endpoints_per_image():
+    small, large = pixel_map(_blank()), pixel_map(_blank(540, 1650))
+    model = _StubWireModel([
+        [[small[2][5], small[11][5]], [small[0][3], small[13][49]]],
+        [[large[6][62], large[1][0]]],
+    ])
+
+    wires = detect_wires_batch([_blank(), _blank(540, 1650)], model, [small, large])
+
+    assert model.calls == [(2, WIRE_PREDICT_ARGS)]
+    assert wires == [
+        [[0, "Wire 1", ["A5", "F5"]], [0, "Wire 2", ["U-3", "L-49"]]],
+        [[0, "Wire 1", ["E62", "U+0"]]],
+    ]
+
+
+def test_detect_wires_needs_two_keypoints():
+    holes = pixel_map(_blank())
+
+    assert detect_wires(_blank(), _StubWireModel([np.zeros((0, 2, 2))]), holes) == []
+    assert detect_wires(_blank(), _StubWireModel([[[holes[2][5]]]]), holes) == []
+
+
+@pytest.mark.parametrize("keypoints", [1, 2, 3])
+@pytest.mark.parametrize("seed", range(5))
+def test_detect_wires_matches_reference(seed, keypoints):
+    rng = np.random.default_rng(seed)
+    holes = pixel_map(_blank())
+    kpts = rng.uniform(0, [700, 440], size=(int(rng.integers(0, 8)), keypoints, 2)).astype(np.float32)
+
+    expected = []
+    if keypoints >= 2:
+        for idx, wire in enumerate(kpts):
+            ends = [_reference_nearest_hole((float(x), float(y)), holes) for x, y in wire[:2]]
+            expected.append([0, f"Wire {idx+1}", [_Y_TO_LETTER[r] + str(c) for r, c in ends]])
+
+    assert detect_wires(_blank(), _StubWireModel([kpts]), holes) == expected
+
+
+# --- analyze_breadboard ---
+def test_analyze_breadboard_matches_sequential_stages():
+    image = _board_photo()
+
+    warped, components, wires = analyze_breadboard(image, *_board_models(1))
+
+    comp_model, wire_model = _board_models(1)
+    expected_warped = detect_breadboard(image)
+    holes = pixel_map(expected_warped)
+    expected_wires = detect_wires(expected_warped, wire_model, holes)
+    expected_components = map_terminals_to_holes(
+        extract_component_terminals(detect_components(expected_warped, comp_model)), holes)
+
+    assert np.array_equal(warped, expected_warped)
+    assert components == expected_components and components
+    assert wires == expected_wires and wires
+
+
+def test_analyze_breadboard_serializes_each_shared_model():
+    image, runs = _board_photo(), 6
+    comp_stub, wire_stub = _board_models(runs)
+    comp_model, wire_model = _SerialProbe(comp_stub), _SerialProbe(wire_stub)
+    expected = analyze_breadboard(image, *_board_models(1))
+    results = [None] * runs
+
+    def run(i):
+        results[i] = analyze_breadboard(image, comp_model, wire_model)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(runs)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+    assert comp_model.max_active == 1 and wire_model.max_active == 1
+    assert len(comp_stub.calls) == len(wire_stub.calls) == runs
+    for warped, components, wires in results:
+        assert np.array_equal(warped, expected[0])
+        assert (components, wires) == expected[1:]
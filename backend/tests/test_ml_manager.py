@@ -0,0 +1,30 @@
+from app.cv_engine import COMPONENT_PREDICT_ARGS
+from app.ml_manager import MLManager
+
+
+class _RecordingModel:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+
+    def predict(self, source, **kwargs):
+        self.calls.append((source.shape, kwargs))
+        if self.error:
+            raise self.error
+
+
+def test_warm_up_uses_production_predict_args():
+    model = _RecordingModel()
+
+    MLManager._warm_up(model, COMPONENT_PREDICT_ARGS)
+
+    assert len(model.calls) == 1
+    shape, kwargs = model.calls[0]
+    assert shape[2] == 3
+    assert kwargs == {**COMPONENT_PREDICT_ARGS, "verbose": False}
+
+
+def test_warm_up_failure_does_not_raise(capsys):
+    MLManager._warm_up(_RecordingModel(RuntimeError("no GPU")), {})
+
+    assert "Model warm-up failed: no GPU" in capsys.readouterr().out